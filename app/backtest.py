@@ -2,21 +2,48 @@
 from __future__ import annotations
 
 import math
+import threading
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 import yfinance as yf
+from cachetools import TTLCache
+from requests_cache import CachedSession
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is an optional accelerator
+
+    def njit(*args: Any, **kwargs: Any) -> Any:
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 INITIAL_EQUITY: float = 100_000.0
 FAST_LENGTH = 5
 SLOW_LENGTH = 15
 
+# Upstream responses are cached on disk for a short while so repeat backtests
+# skip the network round trip (and reuse one pooled HTTP session otherwise).
+HTTP_CACHE_TTL = timedelta(minutes=15)
+_HTTP_SESSION = CachedSession("cpt_hindsight_yfinance", use_temp=True, expire_after=HTTP_CACHE_TTL)
+
+# Parsed frames for closed ranges are also kept in memory, but only for the same
+# window: Yahoo rewrites past Adj Close values after dividends and splits.
+_HISTORY_CACHE: TTLCache = TTLCache(maxsize=32, ttl=HTTP_CACHE_TTL.total_seconds())
+_HISTORY_CACHE_LOCK = threading.Lock()
+
 
 def _round(value: float) -> float:
     return round(float(value), 2)
 
 
+def _round_array(values: pd.Series | np.ndarray) -> List[float]:
+    return np.round(np.asarray(values, dtype=np.float64), 2).tolist()
+
+
 def _format_date(value: Any) -> str:
     if isinstance(value, pd.Timestamp):
         try:
@@ -31,16 +58,37 @@ def _format_date(value: Any) -> str:
     return str(value)
 
 
+def _format_dates(index: pd.Index) -> List[str]:
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return index.strftime("%Y-%m-%d").tolist()
+    return [_format_date(value) for value in index]
+
+
 def _download_history(ticker: str, start_date: date, end_date: date, interval: str) -> pd.DataFrame:
+    # Ranges touching today still gain bars during the session, so they skip the
+    # in-memory cache and only go through the HTTP cache.
+    if end_date >= date.today():
+        return _fetch_history(ticker, start_date, end_date, interval)
+
+    key = (ticker, start_date, end_date, interval)
+    with _HISTORY_CACHE_LOCK:
+        frame = _HISTORY_CACHE.get(key)
+    if frame is None:
+        frame = _fetch_history(ticker, start_date, end_date, interval)
+        with _HISTORY_CACHE_LOCK:
+            _HISTORY_CACHE[key] = frame
+    return frame.copy(deep=False)
+
+
+def _fetch_history(ticker: str, start_date: date, end_date: date, interval: str) -> pd.DataFrame:
     try:
-        frame = yf.download(
-            tickers=ticker,
+        frame = yf.Ticker(ticker, session=_HTTP_SESSION).history(
             start=start_date.isoformat(),
             end=(end_date + timedelta(days=1)).isoformat(),
             interval=interval,
             auto_adjust=False,
-            threads=False,
-            progress=False,
         )
     except Exception as exc:  # pragma: no cover - defensive against upstream errors
         raise RuntimeError("Failed to retrieve price data from upstream provider.") from exc
@@ -54,15 +102,19 @@ def _download_history(ticker: str, start_date: date, end_date: date, interval: s
         except KeyError as exc:
             raise ValueError(f"Price data for {ticker} was not returned.") from exc
 
-    frame = frame.rename(columns={"Adj Close": "AdjClose"})
+    frame = frame.rename(columns={"Adj Close": "AdjClose"}, copy=False)
 
-    required_columns = {"Open", "High", "Low", "Close", "AdjClose"}
-    missing = required_columns - set(frame.columns)
+    price_columns = ["Open", "High", "Low", "Close", "AdjClose"]
+    missing = set(price_columns) - set(frame.columns)
     if missing:
         raise ValueError("Downloaded data did not contain required OHLCV columns.")
 
-    frame = frame.sort_index()
-    frame = frame.dropna(subset=["Open", "High", "Low", "Close", "AdjClose"])
+    # Keep only the columns used downstream so later copies stay narrow, and
+    # skip the sort copy for the (usual) already-ordered upstream index.
+    frame = frame[price_columns + (["Volume"] if "Volume" in frame.columns else [])]
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    frame = frame.dropna(subset=price_columns)
     if frame.empty:
         raise ValueError("Downloaded data did not include usable price rows.")
 
@@ -75,148 +127,187 @@ def _download_history(ticker: str, start_date: date, end_date: date, interval: s
     return frame
 
 
-def _build_price_history(frame: pd.DataFrame) -> List[Dict[str, Any]]:
-    history: List[Dict[str, Any]] = []
-    for index, row in frame.iterrows():
-        next_open = row.get("NextOpen")
-        history.append(
-            {
-                "Date": _format_date(index),
-                "Open": _round(row["Open"]),
-                "High": _round(row["High"]),
-                "Low": _round(row["Low"]),
-                "Close": _round(row["Close"]),
-                "AdjClose": _round(row["AdjClose"]),
-                "Volume": int(round(float(row["Volume"]))),
-                "NextOpen": None if pd.isna(next_open) else _round(next_open),
-            }
-        )
-    return history
-
-
-def _simple_moving_average(series: List[float], index: int, period: int) -> float:
-    if index < 0:
-        raise ValueError("Index must be non-negative.")
-    start = max(0, index - period + 1)
-    subset = series[start : index + 1]
-    if not subset:
-        return series[index]
-    return sum(subset) / len(subset)
-
-
-def run_backtest(ticker: str, start_date: date, end_date: date, interval: str) -> Dict[str, Any]:
-    frame = _download_history(ticker, start_date, end_date, interval)
+def _build_price_history(frame: pd.DataFrame, dates: List[str]) -> Dict[str, List[Any]]:
+    """Return the price history as parallel columns keyed by field name."""
+    return {
+        "Date": dates,
+        "Open": _round_array(frame["Open"]),
+        "High": _round_array(frame["High"]),
+        "Low": _round_array(frame["Low"]),
+        "Close": _round_array(frame["Close"]),
+        "AdjClose": _round_array(frame["AdjClose"]),
+        "Volume": frame["Volume"].to_numpy(dtype=np.float64).round().astype(np.int64).tolist(),
+        "NextOpen": [None if math.isnan(value) else value for value in _round_array(frame["NextOpen"])],
+    }
 
-    price_history = _build_price_history(frame)
-    dates = [entry["Date"] for entry in price_history]
-    closes = frame["Close"].tolist()
-    adj_closes = frame["AdjClose"].tolist()
-    opens = frame["Open"].tolist()
 
-    cash = INITIAL_EQUITY
+def _crossover_signals(adj_closes: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    fast = adj_closes.rolling(FAST_LENGTH, min_periods=1).mean().to_numpy()
+    slow = adj_closes.rolling(SLOW_LENGTH, min_periods=1).mean().to_numpy()
+    # Rolling sums carry rounding noise (~1e-15), so means that are mathematically
+    # equal can compare unequal; treat near-equal means as a tie, not a crossover.
+    tied = np.isclose(fast, slow, rtol=1e-9, atol=0.0)
+    above = (fast > slow) & ~tied
+    below = (fast < slow) & ~tied
+    cross_up = np.zeros(len(fast), dtype=bool)
+    cross_down = np.zeros(len(fast), dtype=bool)
+    # Prices are NaN-free here, so "not above" is exactly "fast <= slow".
+    np.greater(above[1:], above[:-1], out=cross_up[1:])
+    np.greater(below[1:], below[:-1], out=cross_down[1:])
+    return cross_up, cross_down
+
+
+_PENDING_BUY = 1
+_PENDING_SELL = 2
+
+
+@njit(cache=True, nogil=True)
+def _run_backtest_core(
+    opens: np.ndarray,
+    closes: np.ndarray,
+    cross_up: np.ndarray,
+    cross_down: np.ndarray,
+    initial_equity: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]:
+    n = len(closes)
+    equity = np.empty(n, dtype=np.float64)
+    max_trades = n // 2 + 1
+    trade_entry_idx = np.empty(max_trades, dtype=np.int64)
+    trade_exit_idx = np.empty(max_trades, dtype=np.int64)
+    trade_entry_price = np.empty(max_trades, dtype=np.float64)
+    trade_exit_price = np.empty(max_trades, dtype=np.float64)
+    trade_shares = np.empty(max_trades, dtype=np.int64)
+    trade_pnl = np.empty(max_trades, dtype=np.float64)
+    trade_count = 0
+
+    cash = initial_equity
     shares = 0
     entry_price = 0.0
-    entry_date = ""
-    pending_order: Dict[str, Any] | None = None
-
-    trades: List[Dict[str, Any]] = []
-    equity_curve: List[Dict[str, Any]] = []
-
-    for index, current_date in enumerate(dates):
-        bar_close = closes[index]
-
-        if pending_order and pending_order["date"] == current_date:
-            if pending_order["type"] == "buy":
-                cost = pending_order["shares"] * pending_order["price"]
-                cash -= cost
-                shares += pending_order["shares"]
-                entry_price = pending_order["price"]
-                entry_date = pending_order["date"]
+    entry_idx = -1
+    pending_type = _PENDING_BUY  # only read while pending_idx points at a bar
+    pending_idx = -1
+    pending_price = 0.0
+    pending_shares = 0
+
+    for i in range(n):
+        # Orders always fill on the bar after they are placed, so the bar
+        # index alone identifies a due order and none is ever outstanding
+        # once it has been checked.
+        if pending_idx == i:
+            if pending_type == _PENDING_BUY:
+                cash -= pending_shares * pending_price
+                shares += pending_shares
+                entry_price = pending_price
+                entry_idx = i
             else:
-                exit_price = pending_order["price"]
-                proceeds = pending_order["shares"] * exit_price
-                cost_basis = pending_order["shares"] * entry_price
-                pnl = proceeds - cost_basis
+                proceeds = pending_shares * pending_price
                 cash += proceeds
-                trades.append(
-                    {
-                        "entryDate": entry_date,
-                        "exitDate": pending_order["date"],
-                        "entryPrice": _round(entry_price),
-                        "exitPrice": _round(exit_price),
-                        "shares": pending_order["shares"],
-                        "pnl": _round(pnl),
-                        "returnPct": _round((pnl / cost_basis) * 100) if cost_basis else 0.0,
-                    }
-                )
+                trade_entry_idx[trade_count] = entry_idx
+                trade_exit_idx[trade_count] = i
+                trade_entry_price[trade_count] = entry_price
+                trade_exit_price[trade_count] = pending_price
+                trade_shares[trade_count] = pending_shares
+                trade_pnl[trade_count] = proceeds - pending_shares * entry_price
+                trade_count += 1
                 shares = 0
                 entry_price = 0.0
-                entry_date = ""
-            pending_order = None
-
-        fast = _simple_moving_average(adj_closes, index, FAST_LENGTH)
-        slow = _simple_moving_average(adj_closes, index, SLOW_LENGTH)
-        prev_fast = (
-            _simple_moving_average(adj_closes, index - 1, FAST_LENGTH)
-            if index > 0
-            else fast
-        )
-        prev_slow = (
-            _simple_moving_average(adj_closes, index - 1, SLOW_LENGTH)
-            if index > 0
-            else slow
-        )
-
-        have_position = shares > 0
-        crossover_up = fast > slow and prev_fast <= prev_slow
-        crossover_down = fast < slow and prev_fast >= prev_slow
+                entry_idx = -1
+            pending_idx = -1
 
-        if not pending_order and index + 1 < len(dates):
-            next_open_price = opens[index + 1]
-            next_date = dates[index + 1]
-            if not have_position and crossover_up:
+        if i + 1 < n:
+            next_open_price = opens[i + 1]
+            if shares == 0 and cross_up[i]:
                 investable_cash = cash * 0.95
-                planned_shares = max(int(math.floor(investable_cash / next_open_price)), 0)
+                planned_shares = int(investable_cash // next_open_price)
                 if planned_shares > 0:
-                    pending_order = {
-                        "type": "buy",
-                        "date": next_date,
-                        "price": next_open_price,
-                        "shares": planned_shares,
-                    }
-            elif have_position and crossover_down:
-                pending_order = {
-                    "type": "sell",
-                    "date": next_date,
-                    "price": next_open_price,
-                    "shares": shares,
-                }
-
-        mark_to_market = cash + shares * bar_close
-        equity_curve.append({"Date": current_date, "Equity": _round(mark_to_market)})
+                    pending_type = _PENDING_BUY
+                    pending_idx = i + 1
+                    pending_price = next_open_price
+                    pending_shares = planned_shares
+            elif shares > 0 and cross_down[i]:
+                pending_type = _PENDING_SELL
+                pending_idx = i + 1
+                pending_price = next_open_price
+                pending_shares = shares
+
+        equity[i] = cash + shares * closes[i]
 
     if shares > 0:
-        final_close = closes[-1]
+        final_close = closes[n - 1]
         proceeds = shares * final_close
-        cost_basis = shares * entry_price
-        pnl = proceeds - cost_basis
         cash += proceeds
+        trade_entry_idx[trade_count] = entry_idx
+        trade_exit_idx[trade_count] = n - 1
+        trade_entry_price[trade_count] = entry_price
+        trade_exit_price[trade_count] = final_close
+        trade_shares[trade_count] = shares
+        trade_pnl[trade_count] = proceeds - shares * entry_price
+        trade_count += 1
+        equity[n - 1] = cash
+
+    return (
+        equity,
+        trade_entry_idx,
+        trade_exit_idx,
+        trade_entry_price,
+        trade_exit_price,
+        trade_shares,
+        trade_pnl,
+        trade_count,
+    )
+
+
+def run_backtest(ticker: str, start_date: date, end_date: date, interval: str) -> Dict[str, Any]:
+    frame = _download_history(ticker, start_date, end_date, interval)
+
+    dates = _format_dates(frame.index)
+    price_history = _build_price_history(frame, dates)
+    cross_up, cross_down = _crossover_signals(frame["AdjClose"])
+
+    (
+        equity,
+        trade_entry_idx,
+        trade_exit_idx,
+        trade_entry_price,
+        trade_exit_price,
+        trade_shares,
+        trade_pnl,
+        trade_count,
+    ) = _run_backtest_core(
+        frame["Open"].to_numpy(dtype=np.float64),
+        frame["Close"].to_numpy(dtype=np.float64),
+        cross_up,
+        cross_down,
+        INITIAL_EQUITY,
+    )
+
+    trades: List[Dict[str, Any]] = []
+    for entry_idx, exit_idx, entry_price, exit_price, shares, pnl in zip(
+        trade_entry_idx[:trade_count].tolist(),
+        trade_exit_idx[:trade_count].tolist(),
+        trade_entry_price[:trade_count].tolist(),
+        trade_exit_price[:trade_count].tolist(),
+        trade_shares[:trade_count].tolist(),
+        trade_pnl[:trade_count].tolist(),
+    ):
+        cost_basis = shares * entry_price
         trades.append(
             {
-                "entryDate": entry_date,
-                "exitDate": dates[-1],
+                "entryDate": dates[entry_idx],
+                "exitDate": dates[exit_idx],
                 "entryPrice": _round(entry_price),
-                "exitPrice": _round(final_close),
+                "exitPrice": _round(exit_price),
                 "shares": shares,
                 "pnl": _round(pnl),
                 "returnPct": _round((pnl / cost_basis) * 100) if cost_basis else 0.0,
             }
         )
-        equity_curve[-1] = {"Date": dates[-1], "Equity": _round(cash)}
-        shares = 0
 
-    initial_equity = equity_curve[0]["Equity"] if equity_curve else INITIAL_EQUITY
-    final_equity = equity_curve[-1]["Equity"] if equity_curve else initial_equity
+    equity_curve = [{"Date": day, "Equity": value} for day, value in zip(dates, _round_array(equity))]
+
+    # Summary figures are taken from the rounded values reported to clients.
+    initial_equity = equity_curve[0]["Equity"]
+    final_equity = equity_curve[-1]["Equity"]
     total_return_pct = ((final_equity - initial_equity) / initial_equity) * 100 if initial_equity else 0.0
     wins = sum(1 for trade in trades if trade["pnl"] > 0)
 
@@ -224,8 +315,8 @@ def run_backtest(ticker: str, start_date: date, end_date: date, interval: str) -
         "initialEquity": _round(initial_equity),
         "finalEquity": _round(final_equity),
         "totalReturnPct": _round(total_return_pct),
-        "tradeCount": len(trades),
-        "winRatePct": _round((wins / len(trades)) * 100) if trades else 0.0,
+        "tradeCount": trade_count,
+        "winRatePct": _round((wins / trade_count) * 100) if trade_count else 0.0,
     }
 
     symbol = ticker.upper()
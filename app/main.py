@@ -1,19 +1,49 @@
 from __future__ import annotations
 
-import csv
+import email.message
+import hashlib
+import math
+import os
+import re
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
+from typing import Literal, TypeVar
 
 from datetime import date
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel, Field, field_validator, model_validator
+import anyio.to_thread
+import orjson
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.constants import REF_PREFIX
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 
 from .backtest import run_backtest as execute_backtest
 from .market_data import MarketDataRequest as MarketDataParams, fetch_market_data
 from fastapi.staticfiles import StaticFiles
+from starlette.types import Scope
 
-app = FastAPI(title="CPT Hindsight API", version="0.3.0")
+# Blocking work (yfinance downloads, backtests) runs on AnyIO's worker threads.
+# The pool is per uvicorn worker process and defaults to 40 threads upstream.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    yield
+
+
+app = FastAPI(
+    title="CPT Hindsight API",
+    version="0.4.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 STATIC_DIR = Path(__file__).parent / "static" / "dist"
 DATA_DIR = Path(__file__).parent / "data"
@@ -25,6 +55,16 @@ AVAILABLE_SYMBOLS = {
     "AKER": "Aker ASA",
 }
 
+# Static payloads are encoded once at import instead of on every request.
+_SYMBOLS_JSON = orjson.dumps(
+    [{"symbol": symbol, "name": name} for symbol, name in AVAILABLE_SYMBOLS.items()]
+)
+_HEALTH_JSON = b'{"status":"ok"}'
+
+# The SPA shell is read once; rebuilding the frontend requires a restart.
+_INDEX_FILE = STATIC_DIR / "index.html"
+_INDEX_HTML = _INDEX_FILE.read_bytes() if _INDEX_FILE.exists() else None
+
 
 class MarketDataRequest(BaseModel):
     tickers: list[str]
@@ -67,43 +107,135 @@ class BacktestRequest(BaseModel):
             raise ValueError("startDate must be on or before endDate.")
         return self
 
+
+# Content-hashed bundles never change under the same name, so browsers may keep
+# them forever; everything else revalidates against StaticFiles' ETag.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "public, max-age=60"
+ASSET_CACHE_CONTROL = "no-cache"
+# esbuild's [hash] placeholder expands to eight uppercase base32 characters, e.g. main-5FJ2KQ3D.js.
+_HASHED_ASSET = re.compile(r"-[A-Z0-9]{8}\.(?:js|css|woff2?|png|svg)$")
+
+
+def _static_cache_control(path: str) -> str:
+    if _HASHED_ASSET.search(path):
+        return IMMUTABLE_CACHE_CONTROL
+    if path.endswith(".html") or not os.path.splitext(path)[1]:
+        return INDEX_CACHE_CONTROL
+    return ASSET_CACHE_CONTROL
+
+
+class CachingStaticFiles(StaticFiles):
+    """StaticFiles that adds a Cache-Control header suited to each asset."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = _static_cache_control(path)
+        return response
+
+
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=STATIC_DIR, html=True), name="static")
+    app.mount("/static", CachingStaticFiles(directory=STATIC_DIR, html=True), name="static")
 
 
-@app.get("/", response_class=FileResponse)
-def index() -> FileResponse:
-    index_file = STATIC_DIR / "index.html"
-    if not index_file.exists():
+@app.get("/", response_class=HTMLResponse)
+async def index() -> HTMLResponse:
+    if _INDEX_HTML is None:
         raise HTTPException(status_code=404, detail="Static frontend not built")
-    return FileResponse(index_file)
+    return HTMLResponse(content=_INDEX_HTML, headers={"Cache-Control": INDEX_CACHE_CONTROL})
 
 
 @app.get(f"{API_PREFIX}/symbols")
-def list_symbols() -> JSONResponse:
-    return JSONResponse(
-        [{"symbol": symbol, "name": name} for symbol, name in AVAILABLE_SYMBOLS.items()]
-    )
+async def list_symbols() -> Response:
+    return Response(content=_SYMBOLS_JSON, media_type="application/json")
+
+
+# Data-layer functions signal bad input with ValueError and upstream failures
+# with RuntimeError; anything else falls through to the built-in 500 handler.
+@app.exception_handler(ValueError)
+async def _value_error_handler(_: Request, exc: ValueError) -> ORJSONResponse:
+    return ORJSONResponse({"detail": str(exc)}, status_code=400)
+
+
+@app.exception_handler(RuntimeError)
+async def _runtime_error_handler(_: Request, exc: RuntimeError) -> ORJSONResponse:
+    return ORJSONResponse({"detail": str(exc)}, status_code=502)
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _json_body(model: type[BaseModel]) -> dict[str, object]:
+    """OpenAPI request body and 422 response for handlers that validate raw bytes themselves."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema(by_alias=True)}},
+        },
+        # FastAPI only documents 422 for declared params; reuse its shared error schema.
+        "responses": {
+            "422": {
+                "description": "Validation Error",
+                "content": {"application/json": {"schema": {"$ref": f"{REF_PREFIX}HTTPValidationError"}}},
+            }
+        },
+    }
 
 
-@app.post(f"{API_PREFIX}/market-data")
-def get_market_data(request: MarketDataRequest) -> JSONResponse:
+def _is_json_content_type(content_type: str | None) -> bool:
+    # Same rule FastAPI applies to body params: a missing header is treated as JSON,
+    # otherwise only application/json and application/*+json are accepted.
+    if not content_type:
+        return True
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+
+async def _parse_body(raw_request: Request, model: type[ModelT]) -> ModelT:
+    body = await raw_request.body()
+    if not _is_json_content_type(raw_request.headers.get("content-type")):
+        raise RequestValidationError(
+            [
+                {
+                    "type": "model_attributes_type",
+                    "loc": ("body",),
+                    "msg": "Input should be a valid dictionary or object to extract fields from",
+                    "input": {},
+                }
+            ]
+        )
+    # Validate straight from bytes in pydantic-core, skipping FastAPI's json.loads + dict pass.
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as exc:
+        # Errors about the document itself (json_invalid) carry the raw bytes as input,
+        # which may not be UTF-8; report {} like FastAPI does for JSON decode errors.
+        raise RequestValidationError(
+            [
+                {
+                    **error,
+                    "loc": ("body", *error["loc"]),
+                    **({"input": {}} if isinstance(error["input"], bytes) else {}),
+                }
+                for error in exc.errors()
+            ]
+        ) from exc
+
+
+@app.post(f"{API_PREFIX}/market-data", openapi_extra=_json_body(MarketDataRequest))
+async def get_market_data(raw_request: Request) -> ORJSONResponse:
+    request = await _parse_body(raw_request, MarketDataRequest)
     params = MarketDataParams(
         tickers=request.tickers,
         period=request.period,
         interval=request.interval,
         data_points=request.data_points,
     )
-    try:
-        dataset = fetch_market_data(params)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except RuntimeError as exc:
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
-    except Exception as exc:  # pragma: no cover - unexpected errors
-        raise HTTPException(status_code=500, detail="Unexpected error retrieving market data.") from exc
-
-    return JSONResponse(
+    dataset = await run_in_threadpool(fetch_market_data, params)
+    return ORJSONResponse(
         {
             "tickers": request.tickers,
             "period": request.period,
@@ -114,67 +246,111 @@ def get_market_data(request: MarketDataRequest) -> JSONResponse:
     )
 
 
-@app.post(f"{API_PREFIX}/backtest")
-def run_backtest(request: BacktestRequest) -> JSONResponse:
-    try:
-        payload = execute_backtest(
-            request.ticker,
-            request.start_date,
-            request.end_date,
-            request.interval,
-        )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-    except RuntimeError as exc:
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
-    except Exception as exc:  # pragma: no cover - unexpected errors
-        raise HTTPException(status_code=500, detail="Unexpected error running backtest.") from exc
-    return JSONResponse(payload)
+@app.post(f"{API_PREFIX}/backtest", openapi_extra=_json_body(BacktestRequest))
+async def run_backtest(raw_request: Request) -> ORJSONResponse:
+    request = await _parse_body(raw_request, BacktestRequest)
+    payload = await run_in_threadpool(
+        execute_backtest,
+        request.ticker,
+        request.start_date,
+        request.end_date,
+        request.interval,
+    )
+    return ORJSONResponse(payload)
 
 
-def _load_history(symbol: str) -> list[dict[str, object]]:
+_OHLCV_DTYPES = {
+    "Date": str,
+    "Open": float,
+    "High": float,
+    "Low": float,
+    "Close": float,
+    "Adj Close": float,
+    "Volume": float,
+}
+_OHLCV_REQUIRED_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Adj Close"]
+OHLCV_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _read_bundle(symbol: str) -> pd.DataFrame:
+    """Read a bundled OHLCV file, preferring a pre-typed Parquet copy when usable."""
+    parquet_path = DATA_DIR / f"{symbol}.parquet"
+    if parquet_path.exists():
+        try:
+            return pd.read_parquet(parquet_path, columns=list(_OHLCV_DTYPES))
+        except ImportError:
+            pass  # no Parquet engine installed; the CSV bundle is always shipped alongside
+
     csv_path = DATA_DIR / f"{symbol}.csv"
     if not csv_path.exists():
         raise HTTPException(status_code=404, detail=f"No OHLCV bundle for {symbol}")
+    try:
+        return pd.read_csv(
+            csv_path,
+            usecols=list(_OHLCV_DTYPES),
+            dtype=_OHLCV_DTYPES,
+            float_precision="round_trip",
+        )
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=list(_OHLCV_DTYPES))
 
-    rows: list[dict[str, object]] = []
-    with csv_path.open(newline="", encoding="utf-8") as handle:
-        reader = csv.DictReader(handle)
-        for row in reader:
-            try:
-                rows.append(
-                    {
-                        "Date": row["Date"],
-                        "Open": float(row["Open"]),
-                        "High": float(row["High"]),
-                        "Low": float(row["Low"]),
-                        "Close": float(row["Close"]),
-                        "Adj Close": float(row["Adj Close"]),
-                        "Volume": int(float(row["Volume"])) if row["Volume"] is not None else None,
-                    }
-                )
-            except (KeyError, TypeError, ValueError) as exc:  # pragma: no cover - defensive
-                raise HTTPException(status_code=500, detail=f"Malformed OHLCV row for {symbol}") from exc
-    if not rows:
+
+@lru_cache(maxsize=len(AVAILABLE_SYMBOLS))
+def _load_history(symbol: str) -> dict[str, list[object]]:
+    """Load a bundled OHLCV file as parallel columns keyed by field name."""
+    # Bundles are static for the life of the process; failures raise and are not cached.
+    try:
+        frame = _read_bundle(symbol)
+    except (KeyError, TypeError, ValueError) as exc:  # pragma: no cover - defensive
+        raise HTTPException(status_code=500, detail=f"Malformed OHLCV row for {symbol}") from exc
+    if frame.empty:
         raise HTTPException(status_code=404, detail=f"OHLCV bundle for {symbol} is empty")
-    return rows
+    if frame[_OHLCV_REQUIRED_COLUMNS].isna().to_numpy().any():  # pragma: no cover - defensive
+        raise HTTPException(status_code=500, detail=f"Malformed OHLCV row for {symbol}")
+
+    columns: dict[str, list[object]] = {column: frame[column].tolist() for column in _OHLCV_REQUIRED_COLUMNS}
+    columns["Volume"] = [None if math.isnan(volume) else int(volume) for volume in frame["Volume"].tolist()]
+    return columns
+
+
+def _load_history_rows(symbol: str) -> list[dict[str, object]]:
+    """Row-per-bar view of ``_load_history`` for clients on the original layout."""
+    columns = _load_history(symbol)
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+@lru_cache(maxsize=2 * len(AVAILABLE_SYMBOLS))
+def _ohlcv_json(symbol: str, layout: str) -> tuple[bytes, str]:
+    """Encoded response body and its strong ETag for one symbol/layout."""
+    # The bundles never change in-process, so each response body is encoded once.
+    history = _load_history(symbol) if layout == "columns" else _load_history_rows(symbol)
+    body = orjson.dumps({"symbol": symbol, "name": AVAILABLE_SYMBOLS[symbol], "history": history})
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = (candidate.strip().removeprefix("W/") for candidate in if_none_match.split(","))
+    return any(candidate in (etag, "*") for candidate in candidates)
 
 
 @app.get(f"{API_PREFIX}/ohlcv/{{symbol}}")
-def fetch_history(symbol: str) -> JSONResponse:
+async def fetch_history(
+    symbol: str,
+    raw_request: Request,
+    layout: Literal["rows", "columns"] = "rows",
+) -> Response:
     normalized_symbol = symbol.upper()
     if normalized_symbol not in AVAILABLE_SYMBOLS:
         raise HTTPException(status_code=404, detail=f"Unknown symbol {symbol}")
-    history = _load_history(normalized_symbol)
-    return JSONResponse(
-        {
-            "symbol": normalized_symbol,
-            "name": AVAILABLE_SYMBOLS[normalized_symbol],
-            "history": history,
-        }
-    )
+    body, etag = _ohlcv_json(normalized_symbol, layout)
+    headers = {"ETag": etag, "Cache-Control": OHLCV_CACHE_CONTROL}
+    if _etag_matches(raw_request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/healthz")
-def healthz() -> dict[str, str]:
-    return {"status": "ok"}
+async def healthz() -> Response:
+    return Response(content=_HEALTH_JSON, media_type="application/json")
@@ -1,11 +1,16 @@
 """Utilities for retrieving market data from external providers."""
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from typing import Iterable, Sequence
 
+import numpy as np
 import pandas as pd
+import requests
 import yfinance as yf
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
 
 
 @dataclass(frozen=True)
@@ -29,6 +34,21 @@ VALID_DATA_POINTS = {
     "volume": "Volume",
 }
 
+# Canonical OHLCV position of each column, used to order normalised data points.
+_DATA_POINT_ORDER = {column: position for position, column in enumerate(dict.fromkeys(VALID_DATA_POINTS.values()))}
+
+# One pooled session keeps upstream connections alive between requests instead
+# of paying a fresh TCP/TLS handshake on every download.
+HTTP_POOL_SIZE = 16
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+# Identical requests within the TTL are answered from memory; a short window
+# keeps intraday data fresh while absorbing bursts of repeat lookups.
+MARKET_DATA_CACHE_TTL = 60
+_MARKET_DATA_CACHE: TTLCache = TTLCache(maxsize=256, ttl=MARKET_DATA_CACHE_TTL)
+_MARKET_DATA_CACHE_LOCK = threading.Lock()
+
 
 def _normalise_tickers(tickers: Iterable[str]) -> list[str]:
     normalised = []
@@ -40,21 +60,18 @@ def _normalise_tickers(tickers: Iterable[str]) -> list[str]:
 
 
 def _normalise_data_points(points: Iterable[str]) -> list[str]:
-    seen: set[str] = set()
-    result: list[str] = []
+    columns: set[str] = set()
     for point in points:
         key = point.strip().lower()
         if not key:
             continue
-        if key not in VALID_DATA_POINTS:
+        column_name = VALID_DATA_POINTS.get(key)
+        if column_name is None:
             raise ValueError(f"Unsupported data point '{point}'.")
-        column_name = VALID_DATA_POINTS[key]
-        if column_name not in seen:
-            seen.add(column_name)
-            result.append(column_name)
-    if not result:
+        columns.add(column_name)
+    if not columns:
         raise ValueError("At least one data point must be requested.")
-    return result
+    return sorted(columns, key=_DATA_POINT_ORDER.__getitem__)
 
 
 def _serialise_dataframe(df: pd.DataFrame, data_points: Sequence[str]) -> list[dict[str, float | str]]:
@@ -74,15 +91,19 @@ def _serialise_dataframe(df: pd.DataFrame, data_points: Sequence[str]) -> list[d
     trimmed = trimmed[ordered_columns]
     index = trimmed.index
     if isinstance(index, pd.DatetimeIndex):
-        index = index.tz_localize(None)
+        timestamps = index.tz_localize(None).strftime("%Y-%m-%dT%H:%M:%S").tolist()
+    else:
+        timestamps = [ts.isoformat() if hasattr(ts, "isoformat") else str(ts) for ts in index]
+    columns = [
+        (column, trimmed[column].to_numpy(dtype=float, na_value=np.nan).tolist()) for column in ordered_columns
+    ]
     payload = []
-    for ts, values in trimmed.iterrows():
-        entry: dict[str, float | str] = {"timestamp": ts.isoformat() if hasattr(ts, "isoformat") else str(ts)}
-        for column in ordered_columns:
-            value = values[column]
-            if pd.isna(value):
-                continue
-            entry[column] = float(value)
+    for i, timestamp in enumerate(timestamps):
+        entry: dict[str, float | str] = {"timestamp": timestamp}
+        for column, values in columns:
+            value = values[i]
+            if value == value:  # NaN is the only value not equal to itself
+                entry[column] = value
         payload.append(entry)
     return payload
 
@@ -96,14 +117,31 @@ def fetch_market_data(request: MarketDataRequest) -> dict[str, list[dict[str, fl
 
     data_points = _normalise_data_points(request.data_points)
 
+    key = (tuple(tickers), request.period, request.interval, tuple(data_points))
+    with _MARKET_DATA_CACHE_LOCK:
+        cached = _MARKET_DATA_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    dataset = _download_market_data(tickers, request.period, request.interval, data_points)
+    with _MARKET_DATA_CACHE_LOCK:
+        _MARKET_DATA_CACHE[key] = dataset
+    return dataset
+
+
+def _download_market_data(
+    tickers: list[str], period: str, interval: str, data_points: list[str]
+) -> dict[str, list[dict[str, float | str]]]:
     try:
         raw_df = yf.download(
             tickers=" ".join(tickers),
-            period=request.period,
-            interval=request.interval,
+            period=period,
+            interval=interval,
             auto_adjust=False,
-            threads=False,
+            # yfinance fetches one request per ticker; let it overlap them.
+            threads=len(tickers) > 1,
             progress=False,
+            session=_HTTP_SESSION,
         )
     except Exception as exc:  # pragma: no cover - network/third-party errors
         raise RuntimeError("Failed to retrieve data from upstream provider.") from exc
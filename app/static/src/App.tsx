@@ -15,7 +15,8 @@ import {
 } from "chart.js";
 import "chartjs-adapter-date-fns";
 import { Line } from "react-chartjs-2";
-import type { BacktestResult, EquityPoint, PriceBar } from "./sma";
+import { priceBarsFromColumns } from "./sma";
+import type { BacktestResponse, BacktestResult, EquityPoint, PriceBar } from "./sma";
 
 ChartJS.register(
   CategoryScale,
@@ -531,8 +532,8 @@ export const App: React.FC = () => {
       if (!response.ok) {
         throw new Error(`Failed to run backtest (${response.status})`);
       }
-      const json: BacktestResult = await response.json();
-      setResult(json);
+      const json: BacktestResponse = await response.json();
+      setResult({ ...json, priceHistory: priceBarsFromColumns(json.priceHistory) });
       setBacktestState("success");
     } catch (err) {
       setBacktestState("error");
@@ -43,6 +43,34 @@ export interface BacktestResult {
   priceHistory: PriceBar[];
 }
 
+export interface PriceHistoryColumns {
+  Date: string[];
+  Open: number[];
+  High: number[];
+  Low: number[];
+  Close: number[];
+  AdjClose: number[];
+  Volume: number[];
+  NextOpen: (number | null)[];
+}
+
+export type BacktestResponse = Omit<BacktestResult, "priceHistory"> & {
+  priceHistory: PriceHistoryColumns;
+};
+
+export function priceBarsFromColumns(columns: PriceHistoryColumns): PriceBar[] {
+  return columns.Date.map((date, index) => ({
+    Date: date,
+    Open: columns.Open[index],
+    High: columns.High[index],
+    Low: columns.Low[index],
+    Close: columns.Close[index],
+    AdjClose: columns.AdjClose[index],
+    Volume: columns.Volume[index],
+    NextOpen: columns.NextOpen[index],
+  }));
+}
+
 const INITIAL_EQUITY = 100_000;
 const FAST_LENGTH = 5;
 const SLOW_LENGTH = 15;
@@ -102,10 +130,24 @@ const normalizeRow = (row: RawPriceRow): Omit<PriceBar, "NextOpen"> => {
   };
 };
 
+type RawPriceColumns = Record<string, (string | number | null | undefined)[]>;
+
 type PriceHistoryResponse = {
   symbol: string;
   name: string;
-  history: RawPriceRow[];
+  history: RawPriceColumns;
+};
+
+const rowsFromColumns = (columns: RawPriceColumns): RawPriceRow[] => {
+  const fields = Object.keys(columns);
+  const length = fields.length ? columns[fields[0]].length : 0;
+  return Array.from({ length }, (_, index) => {
+    const row: RawPriceRow = {};
+    for (const field of fields) {
+      row[field] = columns[field][index];
+    }
+    return row;
+  });
 };
 
 type PendingOrder =
@@ -113,12 +155,12 @@ type PendingOrder =
   | { type: "sell"; date: string; price: number; shares: number };
 
 async function fetchPriceHistory(symbol: string): Promise<{ name: string; history: PriceBar[] }> {
-  const response = await fetch(`/api/ohlcv/${encodeURIComponent(symbol)}`);
+  const response = await fetch(`/api/ohlcv/${encodeURIComponent(symbol)}?layout=columns`);
   if (!response.ok) {
     throw new Error(`Failed to download price history (${response.status})`);
   }
   const payload = (await response.json()) as PriceHistoryResponse;
-  const normalized = payload.history
+  const normalized = rowsFromColumns(payload.history)
     .map((row) => normalizeRow(row))
     .sort((a, b) => (a.Date < b.Date ? -1 : a.Date > b.Date ? 1 : 0));
   const history: PriceBar[] = normalized.map((row, index) => ({
@@ -7,6 +7,15 @@ from typing import Dict, List, Optional
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is an optional accelerator
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 
 @dataclass
 class Trade:
@@ -33,11 +42,17 @@ TARGET_ANNUAL_VOL: float = 0.20
 
 def atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int) -> pd.Series:
     """Average True Range helper."""
-    high_low = (high - low).abs()
-    high_close = (high - close.shift(1)).abs()
-    low_close = (low - close.shift(1)).abs()
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    return tr.rolling(period, min_periods=1).mean()
+    high_arr = high.to_numpy(dtype=float)
+    low_arr = low.to_numpy(dtype=float)
+    prev_close = np.empty_like(high_arr)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close.to_numpy(dtype=float)[:-1]
+    # fmax skips NaN like DataFrame.max, so the first bar falls back to high - low.
+    tr = np.fmax(
+        np.fmax(np.abs(high_arr - low_arr), np.abs(high_arr - prev_close)),
+        np.abs(low_arr - prev_close),
+    )
+    return pd.Series(tr, index=high.index).rolling(period, min_periods=1).mean()
 
 
 def apply_cost(price: float, side: str) -> float:
@@ -45,127 +60,220 @@ def apply_cost(price: float, side: str) -> float:
     return float(price)
 
 
-def backtest_weekly(
-    w: pd.DataFrame,
-    signals: Signals,
-    trail_atr_mult: Optional[pd.Series] = None,
-    label: str = "Strategy",
-    macro_long: Optional[pd.Series] = None,
-    macro_short: Optional[pd.Series] = None,
-    allow_shorts: bool = True
-) -> Dict:
-    """Backtest one strategy on weekly data.
-    Includes long/short logic, macro filters, and volatility targeting.
+def _cost_adjusted(prices: np.ndarray, side: str) -> np.ndarray:
+    """Run ``apply_cost`` over every tradable price, outside the jitted loop."""
+    adjusted = np.full_like(prices, np.nan)
+    for i in np.flatnonzero(~np.isnan(prices)).tolist():
+        adjusted[i] = apply_cost(prices[i], side)
+    return adjusted
+
+
+@njit(cache=True)
+def _backtest_weekly_core(
+    high: np.ndarray,
+    low: np.ndarray,
+    adj_close: np.ndarray,
+    next_open: np.ndarray,
+    buy_px: np.ndarray,
+    sell_px: np.ndarray,
+    atr14: np.ndarray,
+    trail: np.ndarray,
+    use_trail: bool,
+    long_entry: np.ndarray,
+    short_entry: np.ndarray,
+    long_exit: np.ndarray,
+    short_exit: np.ndarray,
+    macro_long: np.ndarray,
+    use_macro_long: bool,
+    macro_short: np.ndarray,
+    use_macro_short: bool,
+    allow_shorts: bool,
+    initial_equity: float,
+    target_vol: float,
+):
+    """Numeric core of ``backtest_weekly``.
+
+    Works on positional arrays only; ``buy_px``/``sell_px`` are ``next_open``
+    with costs already applied. Trades come back as parallel arrays
+    (entry/exit bar positions, prices, size, pnl, return) plus a count.
     """
-    equity = INITIAL_EQUITY
-    in_pos = False
-    side = None  # 'long' or 'short'
+    n = len(next_open)
+    n_bars = max(n - 1, 0)
+    curve_mtm = np.empty(n_bars)
+    entry_pos = np.empty(n, dtype=np.int64)
+    exit_pos = np.empty(n, dtype=np.int64)
+    entry_pxs = np.empty(n)
+    exit_pxs = np.empty(n)
+    sizes = np.empty(n)
+    pnls = np.empty(n)
+    rets = np.empty(n)
+    n_trades = 0
+
+    sqrt_52 = math.sqrt(52)
+    equity = initial_equity
+    side = 0  # 1 long, -1 short, 0 flat
     entry_px = np.nan
-    entry_idx = None
+    entry_i = -1
     shares = 0.0
 
-    atr14 = atr(w["High"], w["Low"], w["Close"], 14)
-
-    trades: List[Trade] = []
-    curve = []
-
-    for i in range(len(w) - 1):
-        idx = w.index[i]
-        next_idx = w.index[i + 1]
-        next_open = w.loc[idx, "NextOpen"]
-        if pd.isna(next_open):
-            curve.append((idx, equity))
+    for i in range(n_bars):
+        px_next = next_open[i]
+        if px_next != px_next:
+            curve_mtm[i] = equity
             continue
 
-        allow_long = True if macro_long is None else bool(macro_long.iloc[i])
-        allow_short = True if macro_short is None else bool(macro_short.iloc[i])
+        allow_long = macro_long[i] if use_macro_long else True
+        allow_short = macro_short[i] if use_macro_short else True
 
-        if not in_pos:
-            if pd.isna(atr14.iloc[i]) or atr14.iloc[i] == 0:
-                curve.append((idx, equity))
+        if side == 0:
+            atr_i = atr14[i]
+            if atr_i != atr_i or atr_i == 0:
+                curve_mtm[i] = equity
                 continue
-            shares_target = (equity * TARGET_ANNUAL_VOL) / (atr14.iloc[i] * math.sqrt(52))
-            if signals.long_entry.iloc[i] and allow_long:
-                px_buy = apply_cost(next_open, "buy")
+            shares_target = (equity * target_vol) / (atr_i * sqrt_52)
+            if long_entry[i] and allow_long:
+                px_buy = buy_px[i]
                 shares = min(shares_target, equity / px_buy)
                 entry_px = px_buy
-                entry_idx = next_idx
+                entry_i = i + 1
                 equity -= shares * entry_px
-                side = 'long'
-                in_pos = True
-            elif allow_shorts and signals.short_entry.iloc[i] and allow_short:
-                px_sell = apply_cost(next_open, "sell")
+                side = 1
+            elif allow_shorts and short_entry[i] and allow_short:
+                px_sell = sell_px[i]
                 shares = min(shares_target, equity / px_sell)
-                proceeds = shares * px_sell
-                equity += proceeds
+                equity += shares * px_sell
                 entry_px = px_sell
-                entry_idx = next_idx
-                side = 'short'
-                in_pos = True
+                entry_i = i + 1
+                side = -1
         else:
             exit_flag = False
-            if trail_atr_mult is not None and not pd.isna(trail_atr_mult.iloc[i]):
-                trail = (w.loc[idx, "AdjClose"] - trail_atr_mult.iloc[i]) if side == 'long' else (w.loc[idx, "AdjClose"] + trail_atr_mult.iloc[i])
-                if side == 'long' and w.loc[idx, "Low"] < trail:
+            if use_trail and trail[i] == trail[i]:
+                if side == 1 and low[i] < adj_close[i] - trail[i]:
                     exit_flag = True
-                if side == 'short' and w.loc[idx, "High"] > trail:
+                if side == -1 and high[i] > adj_close[i] + trail[i]:
                     exit_flag = True
 
-            if side == 'long' and signals.long_exit.iloc[i]:
+            if side == 1 and (long_exit[i] or not allow_long):
                 exit_flag = True
-            if side == 'short' and signals.short_exit.iloc[i]:
-                exit_flag = True
-
-            if side == 'long' and not allow_long:
-                exit_flag = True
-            if side == 'short' and not allow_short:
+            if side == -1 and (short_exit[i] or not allow_short):
                 exit_flag = True
 
             if exit_flag:
-                if side == 'long':
-                    px_sell = apply_cost(next_open, "sell")
-                    proceeds = shares * px_sell
+                if side == 1:
+                    px_exit = sell_px[i]
+                    proceeds = shares * px_exit
                     pnl = proceeds - (shares * entry_px)
-                    ret = pnl / (shares * entry_px) if entry_px > 0 else 0.0
                     equity += proceeds
-                    trades.append(Trade(entry_idx, entry_px, next_idx, px_sell, shares, pnl, ret))
                 else:
-                    px_buy = apply_cost(next_open, "buy")
-                    cost = shares * px_buy
+                    px_exit = buy_px[i]
+                    cost = shares * px_exit
                     pnl = (shares * entry_px) - cost
-                    ret = pnl / (shares * entry_px) if entry_px > 0 else 0.0
                     equity -= cost
-                    trades.append(Trade(entry_idx, entry_px, next_idx, px_buy, shares, pnl, ret))
-                in_pos = False
-                side = None
+                entry_pos[n_trades] = entry_i
+                exit_pos[n_trades] = i + 1
+                entry_pxs[n_trades] = entry_px
+                exit_pxs[n_trades] = px_exit
+                sizes[n_trades] = shares
+                pnls[n_trades] = pnl
+                rets[n_trades] = pnl / (shares * entry_px) if entry_px > 0 else 0.0
+                n_trades += 1
+                side = 0
                 entry_px = np.nan
-                entry_idx = None
+                entry_i = -1
                 shares = 0.0
 
         mtm = equity
-        if in_pos:
-            if side == 'long':
-                mtm += shares * w.loc[idx, "AdjClose"]
-            else:
-                mtm += (shares * entry_px) - (shares * w.loc[idx, "AdjClose"])
-        curve.append((idx, mtm))
-
-    if in_pos:
-        last_idx = w.index[-2]
-        final_open = w.loc[last_idx, "NextOpen"]
-        if not pd.isna(final_open):
-            if side == 'long':
-                px_sell = apply_cost(final_open, "sell")
-                proceeds = shares * px_sell
-                pnl = proceeds - (shares * entry_px)
-                equity += proceeds
-                trades.append(Trade(entry_idx, entry_px, w.index[-1], px_sell, shares, pnl, pnl / (shares * entry_px)))
+        if side == 1:
+            mtm += shares * adj_close[i]
+        elif side == -1:
+            mtm += (shares * entry_px) - (shares * adj_close[i])
+        curve_mtm[i] = mtm
+
+    if side != 0:
+        final_open = next_open[n - 2]
+        if final_open == final_open:
+            if side == 1:
+                px_exit = sell_px[n - 2]
+                pnl = (shares * px_exit) - (shares * entry_px)
             else:
-                px_buy = apply_cost(final_open, "buy")
-                cost = shares * px_buy
-                pnl = (shares * entry_px) - cost
-                equity -= cost
-                trades.append(Trade(entry_idx, entry_px, w.index[-1], px_buy, shares, pnl, pnl / (shares * entry_px)))
+                px_exit = buy_px[n - 2]
+                pnl = (shares * entry_px) - (shares * px_exit)
+            entry_pos[n_trades] = entry_i
+            exit_pos[n_trades] = n - 1
+            entry_pxs[n_trades] = entry_px
+            exit_pxs[n_trades] = px_exit
+            sizes[n_trades] = shares
+            pnls[n_trades] = pnl
+            rets[n_trades] = pnl / (shares * entry_px)
+            n_trades += 1
+
+    return curve_mtm, entry_pos, exit_pos, entry_pxs, exit_pxs, sizes, pnls, rets, n_trades
+
+
+def backtest_weekly(
+    w: pd.DataFrame,
+    signals: Signals,
+    trail_atr_mult: Optional[pd.Series] = None,
+    label: str = "Strategy",
+    macro_long: Optional[pd.Series] = None,
+    macro_short: Optional[pd.Series] = None,
+    allow_shorts: bool = True
+) -> Dict:
+    """Backtest one strategy on weekly data.
+    Includes long/short logic, macro filters, and volatility targeting.
+    """
+    # The jitted core does not bounds-check, so every per-bar input must line up with ``w``.
+    per_bar_inputs = {
+        "long_entry": signals.long_entry,
+        "short_entry": signals.short_entry,
+        "long_exit": signals.long_exit,
+        "short_exit": signals.short_exit,
+        "trail_atr_mult": trail_atr_mult,
+        "macro_long": macro_long,
+        "macro_short": macro_short,
+    }
+    for name, values in per_bar_inputs.items():
+        if values is not None and len(values) != len(w):
+            raise ValueError(f"{name} has {len(values)} rows but the price frame has {len(w)}.")
+
+    no_filter = np.empty(0, dtype=np.bool_)
+    next_open = w["NextOpen"].to_numpy(dtype=float)
+    curve_mtm, entry_pos, exit_pos, entry_pxs, exit_pxs, sizes, pnls, rets, n_trades = _backtest_weekly_core(
+        w["High"].to_numpy(dtype=float),
+        w["Low"].to_numpy(dtype=float),
+        w["AdjClose"].to_numpy(dtype=float),
+        next_open,
+        _cost_adjusted(next_open, "buy"),
+        _cost_adjusted(next_open, "sell"),
+        atr(w["High"], w["Low"], w["Close"], 14).to_numpy(dtype=float),
+        np.empty(0) if trail_atr_mult is None else trail_atr_mult.to_numpy(dtype=float),
+        trail_atr_mult is not None,
+        signals.long_entry.to_numpy().astype(np.bool_),
+        signals.short_entry.to_numpy().astype(np.bool_),
+        signals.long_exit.to_numpy().astype(np.bool_),
+        signals.short_exit.to_numpy().astype(np.bool_),
+        no_filter if macro_long is None else macro_long.to_numpy().astype(np.bool_),
+        macro_long is not None,
+        no_filter if macro_short is None else macro_short.to_numpy().astype(np.bool_),
+        macro_short is not None,
+        allow_shorts,
+        INITIAL_EQUITY,
+        TARGET_ANNUAL_VOL,
+    )
+
+    index = w.index
+    trades: List[Trade] = [
+        Trade(index[entry_i], entry_px, index[exit_i], exit_px, shares, pnl, ret)
+        for entry_i, exit_i, entry_px, exit_px, shares, pnl, ret in zip(
+            entry_pos[:n_trades].tolist(),
+            exit_pos[:n_trades].tolist(),
+            entry_pxs[:n_trades].tolist(),
+            exit_pxs[:n_trades].tolist(),
+            sizes[:n_trades].tolist(),
+            pnls[:n_trades].tolist(),
+            rets[:n_trades].tolist(),
+        )
+    ]
 
-    curve_df = pd.DataFrame(curve, columns=["Date", "Equity"]).set_index("Date")
+    curve_df = pd.DataFrame({"Equity": curve_mtm}, index=index[: len(curve_mtm)].rename("Date"))
     return {"label": label, "equity_curve": curve_df, "trades": trades}
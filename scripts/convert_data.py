@@ -0,0 +1,32 @@
+"""Write Parquet copies of the bundled OHLCV CSV files in app/data.
+
+The API reads ``{symbol}.parquet`` in preference to ``{symbol}.csv`` when a
+Parquet engine (pyarrow) is installed. Run after updating any CSV bundle:
+
+    python scripts/convert_data.py
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "app" / "data"
+NUMERIC_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def convert(csv_path: Path) -> Path:
+    frame = pd.read_csv(csv_path, dtype={"Date": str}, float_precision="round_trip")
+    frame[NUMERIC_COLUMNS] = frame[NUMERIC_COLUMNS].astype(float)
+    parquet_path = csv_path.with_suffix(".parquet")
+    frame.to_parquet(parquet_path, engine="pyarrow", compression="zstd", index=False)
+    return parquet_path
+
+
+def main() -> None:
+    for csv_path in sorted(DATA_DIR.glob("*.csv")):
+        print(f"{csv_path.name} -> {convert(csv_path).name}")
+
+
+if __name__ == "__main__":
+    main()
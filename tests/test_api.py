@@ -2,7 +2,10 @@ from fastapi.testclient import TestClient
 
 from datetime import date
 
-from app.main import app
+import pandas as pd
+import pytest
+
+from app.main import _load_history, _ohlcv_json, _static_cache_control, app
 
 
 client = TestClient(app)
@@ -18,6 +21,43 @@ def test_symbols_endpoint_lists_available_symbols():
     assert all({"symbol", "name"}.issubset(item.keys()) for item in payload)
 
 
+def test_index_serves_spa_shell():
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert '<div id="root"></div>' in response.text
+
+
+def test_static_assets_send_cache_control():
+    assert client.get("/").headers["cache-control"] == "public, max-age=60"
+
+    response = client.get("/static/assets/main.js")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get("/static/assets/main.js", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["cache-control"] == "no-cache"
+
+    assert _static_cache_control("assets/main-5FJ2KQ3D.js") == "public, max-age=31536000, immutable"
+    assert _static_cache_control("assets/chunk-QWERTY23.css") == "public, max-age=31536000, immutable"
+    assert _static_cache_control("assets/main.js") == "no-cache"
+    assert _static_cache_control("index.html") == "public, max-age=60"
+
+
+@pytest.mark.parametrize("path", ["/api/backtest", "/api/market-data"])
+def test_post_endpoints_document_validation_errors(path):
+    schema = client.get("/openapi.json").json()
+
+    operation = schema["paths"][path]["post"]
+    assert operation["requestBody"]["content"]["application/json"]["schema"]["type"] == "object"
+    assert operation["responses"]["422"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/HTTPValidationError"
+    }
+    assert "HTTPValidationError" in schema["components"]["schemas"]
+
+
 def test_health_endpoint_reports_ok():
     response = client.get("/healthz")
 
@@ -25,6 +65,78 @@ def test_health_endpoint_reports_ok():
     assert response.json() == {"status": "ok"}
 
 
+def test_ohlcv_endpoint_returns_bundled_history():
+    response = client.get("/api/ohlcv/nhy")
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["symbol"] == "NHY"
+    assert payload["name"] == "Norsk Hydro"
+    first = payload["history"][0]
+    assert set(first) == {"Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"}
+    assert isinstance(first["Volume"], int)
+
+
+def test_ohlcv_endpoint_supports_columnar_layout():
+    rows = client.get("/api/ohlcv/NHY").json()["history"]
+    response = client.get("/api/ohlcv/NHY", params={"layout": "columns"})
+
+    assert response.status_code == 200
+    columns = response.json()["history"]
+    assert list(columns) == ["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"]
+    assert all(len(values) == len(rows) for values in columns.values())
+    assert {key: values[0] for key, values in columns.items()} == rows[0]
+
+
+def test_ohlcv_history_prefers_parquet_bundle(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    columns = {
+        "Date": ["2024-01-05"],
+        "Open": [1.0],
+        "High": [2.0],
+        "Low": [0.5],
+        "Close": [1.5],
+        "Adj Close": [1.4],
+        "Volume": [1000.0],
+    }
+    pd.DataFrame(columns).to_parquet(tmp_path / "NHY.parquet", index=False)
+    pd.DataFrame({**columns, "Open": [9.0]}).to_csv(tmp_path / "NHY.csv", index=False)
+    monkeypatch.setattr("app.main.DATA_DIR", tmp_path)
+    _load_history.cache_clear()
+    _ohlcv_json.cache_clear()
+
+    try:
+        history = client.get("/api/ohlcv/NHY").json()["history"]
+    finally:
+        _load_history.cache_clear()
+        _ohlcv_json.cache_clear()
+
+    assert history == [{**{key: values[0] for key, values in columns.items()}, "Volume": 1000}]
+
+
+def test_ohlcv_endpoint_answers_conditional_requests_with_304():
+    first = client.get("/api/ohlcv/EQNR")
+    etag = first.headers["etag"]
+
+    assert first.headers["cache-control"] == "public, max-age=3600"
+    assert client.get("/api/ohlcv/EQNR", params={"layout": "columns"}).headers["etag"] != etag
+
+    cached = client.get("/api/ohlcv/EQNR", headers={"If-None-Match": f'W/"other", {etag}'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    stale = client.get("/api/ohlcv/EQNR", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == first.content
+
+
+def test_ohlcv_endpoint_rejects_unknown_symbol():
+    response = client.get("/api/ohlcv/XYZ")
+
+    assert response.status_code == 404
+
+
 def test_backtest_endpoint_invokes_strategy(monkeypatch):
     expected = {
         "symbol": "TEST",
@@ -62,3 +174,64 @@ def test_backtest_endpoint_invokes_strategy(monkeypatch):
 
     assert response.status_code == 200
     assert response.json() == expected
+
+
+@pytest.mark.parametrize(
+    ("error", "status_code"),
+    [(ValueError("No price data returned for TEST."), 400), (RuntimeError("Upstream unavailable."), 502)],
+)
+def test_backtest_endpoint_maps_strategy_errors(monkeypatch, error, status_code):
+    def failing_backtest(*_):
+        raise error
+
+    monkeypatch.setattr("app.main.execute_backtest", failing_backtest)
+
+    response = client.post(
+        "/api/backtest",
+        json={"ticker": "TEST", "startDate": "2023-01-01", "endDate": "2023-01-31", "interval": "1d"},
+    )
+
+    assert response.status_code == status_code
+    assert response.json() == {"detail": str(error)}
+
+
+def test_backtest_endpoint_rejects_non_json_content_type(monkeypatch):
+    def unexpected_backtest(*_):
+        raise AssertionError("backtest should not run for a non-JSON body")
+
+    monkeypatch.setattr("app.main.execute_backtest", unexpected_backtest)
+
+    body = b'{"ticker": "NHY", "startDate": "2023-01-01", "endDate": "2023-01-31", "interval": "1d"}'
+    response = client.post("/api/backtest", content=body, headers={"Content-Type": "text/plain"})
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["loc"] == ["body"]
+    assert error["type"] == "model_attributes_type"
+    assert error["input"] == {}
+
+
+def test_backtest_endpoint_rejects_body_that_is_not_utf8():
+    response = client.post("/api/backtest", content=b"\xff\xfe", headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["type"] == "json_invalid"
+    assert error["input"] == {}
+
+
+def test_backtest_endpoint_rejects_inverted_date_range():
+    response = client.post(
+        "/api/backtest",
+        json={
+            "ticker": "NHY",
+            "startDate": "2023-02-01",
+            "endDate": "2023-01-01",
+            "interval": "1d",
+        },
+    )
+
+    assert response.status_code == 422
+    [error] = response.json()["detail"]
+    assert error["loc"] == ["body"]
+    assert "startDate must be on or before endDate" in error["msg"]
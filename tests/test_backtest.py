@@ -1,29 +1,76 @@
+import math
 from datetime import date
+from fractions import Fraction
 
+import numpy as np
 import pandas as pd
 import pytest
+from cachetools import TTLCache
 
-from app.backtest import run_backtest
+from app import backtest
+from app.backtest import _crossover_signals, _format_dates, run_backtest
 
 
-def test_run_backtest_returns_expected_payload(monkeypatch):
-    dates = pd.date_range("2023-01-01", periods=20, freq="D")
-    data = pd.DataFrame(
+@pytest.fixture(autouse=True)
+def _clear_history_cache():
+    backtest._HISTORY_CACHE.clear()
+    yield
+    backtest._HISTORY_CACHE.clear()
+
+
+def _price_frame(periods: int = 20) -> pd.DataFrame:
+    dates = pd.date_range("2023-01-01", periods=periods, freq="D")
+    return pd.DataFrame(
         {
-            "Open": [100 + i for i in range(20)],
-            "High": [101 + i for i in range(20)],
-            "Low": [99 + i for i in range(20)],
-            "Close": [100 + i for i in range(20)],
-            "AdjClose": [100 + i for i in range(20)],
-            "Volume": [1_000_000 for _ in range(20)],
+            "Open": [100 + i for i in range(periods)],
+            "High": [101 + i for i in range(periods)],
+            "Low": [99 + i for i in range(periods)],
+            "Close": [100 + i for i in range(periods)],
+            "AdjClose": [100 + i for i in range(periods)],
+            "Volume": [1_000_000 for _ in range(periods)],
         },
         index=dates,
     )
 
-    def fake_download(*args, **kwargs):
-        return data.copy()
 
-    monkeypatch.setattr("app.backtest.yf.download", fake_download)
+def _ohlc_frame(opens, closes, start="2023-01-02") -> pd.DataFrame:
+    dates = pd.date_range(start, periods=len(closes), freq="D")
+    return pd.DataFrame(
+        {
+            "Open": opens,
+            "High": np.maximum(opens, closes) + 0.5,
+            "Low": np.minimum(opens, closes) - 0.5,
+            "Close": closes,
+            "AdjClose": closes,
+            "Volume": 1_000_000,
+        },
+        index=dates,
+    )
+
+
+class _FakeTicker:
+    calls: list = []
+    frame: pd.DataFrame | None = None
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+        self.session = session
+
+    def history(self, **kwargs):
+        self.calls.append(self.ticker)
+        return _price_frame() if self.frame is None else self.frame.copy()
+
+
+@pytest.fixture
+def fake_ticker(monkeypatch):
+    _FakeTicker.calls = []
+    _FakeTicker.frame = None
+    monkeypatch.setattr("app.backtest.yf.Ticker", _FakeTicker)
+    return _FakeTicker
+
+
+def test_run_backtest_returns_expected_payload(fake_ticker):
+    data = _price_frame()
 
     result = run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
 
@@ -33,7 +80,246 @@ def test_run_backtest_returns_expected_payload(monkeypatch):
     assert summary["initialEquity"] == pytest.approx(100_000.0)
     assert summary["finalEquity"] >= summary["initialEquity"]
     assert summary["tradeCount"] >= 0
-    assert isinstance(result["priceHistory"], list)
-    assert len(result["priceHistory"]) == len(data)
+    price_history = result["priceHistory"]
+    assert set(price_history) == {"Date", "Open", "High", "Low", "Close", "AdjClose", "Volume", "NextOpen"}
+    assert all(len(column) == len(data) for column in price_history.values())
+    assert price_history["Date"][0] == "2023-01-01"
+    assert price_history["NextOpen"][0] == pytest.approx(101.0)
+    assert price_history["NextOpen"][-1] is None
     assert isinstance(result["equityCurve"], list)
     assert len(result["equityCurve"]) == len(data)
+
+
+def _reference_run_backtest(dates, opens, closes, cross_up, cross_down):
+    """The original dict-based order loop, kept as an oracle for ``_run_backtest_core``."""
+    cash = backtest.INITIAL_EQUITY
+    shares = 0
+    entry_price = 0.0
+    entry_date = ""
+    pending_order = None
+    trades = []
+    equity_curve = []
+
+    for index, current_date in enumerate(dates):
+        if pending_order and pending_order["date"] == current_date:
+            if pending_order["type"] == "buy":
+                cash -= pending_order["shares"] * pending_order["price"]
+                shares += pending_order["shares"]
+                entry_price = pending_order["price"]
+                entry_date = pending_order["date"]
+            else:
+                proceeds = pending_order["shares"] * pending_order["price"]
+                cost_basis = pending_order["shares"] * entry_price
+                cash += proceeds
+                trades.append(
+                    {
+                        "entryDate": entry_date,
+                        "exitDate": current_date,
+                        "entryPrice": round(entry_price, 2),
+                        "exitPrice": round(pending_order["price"], 2),
+                        "shares": pending_order["shares"],
+                        "pnl": round(proceeds - cost_basis, 2),
+                        "returnPct": round((proceeds - cost_basis) / cost_basis * 100, 2),
+                    }
+                )
+                shares = 0
+                entry_price = 0.0
+                entry_date = ""
+            pending_order = None
+
+        if not pending_order and index + 1 < len(dates):
+            next_open_price = opens[index + 1]
+            if shares == 0 and cross_up[index]:
+                planned_shares = max(int(math.floor(cash * 0.95 / next_open_price)), 0)
+                if planned_shares > 0:
+                    pending_order = {
+                        "type": "buy",
+                        "date": dates[index + 1],
+                        "price": next_open_price,
+                        "shares": planned_shares,
+                    }
+            elif shares > 0 and cross_down[index]:
+                pending_order = {
+                    "type": "sell",
+                    "date": dates[index + 1],
+                    "price": next_open_price,
+                    "shares": shares,
+                }
+
+        equity_curve.append({"Date": current_date, "Equity": round(cash + shares * closes[index], 2)})
+
+    if shares > 0:
+        proceeds = shares * closes[-1]
+        cost_basis = shares * entry_price
+        cash += proceeds
+        trades.append(
+            {
+                "entryDate": entry_date,
+                "exitDate": dates[-1],
+                "entryPrice": round(entry_price, 2),
+                "exitPrice": round(closes[-1], 2),
+                "shares": shares,
+                "pnl": round(proceeds - cost_basis, 2),
+                "returnPct": round((proceeds - cost_basis) / cost_basis * 100, 2),
+            }
+        )
+        equity_curve[-1] = {"Date": dates[-1], "Equity": round(cash, 2)}
+
+    return trades, equity_curve
+
+
+def test_run_backtest_trades_a_known_crossover_sequence(fake_ticker):
+    closes = np.array(
+        [100.0] * 15 + [101, 102, 103, 104, 105, 104, 100, 96, 92, 88] + [90, 95, 100, 105, 110, 115, 120, 118]
+    )
+    opens = np.r_[closes[0], closes[:-1] + 0.25]
+    fake_ticker.frame = _ohlc_frame(opens, closes)
+
+    result = run_backtest("TEST", date(2023, 1, 2), date(2023, 2, 3), "1d")
+
+    # Buy 938 shares (95% of cash) at the open after the first upward cross, sell on
+    # the downward cross, then re-enter and get closed out at the last close.
+    assert result["trades"] == [
+        {
+            "entryDate": "2023-01-18",
+            "exitDate": "2023-01-26",
+            "entryPrice": 101.25,
+            "exitPrice": 92.25,
+            "shares": 938,
+            "pnl": -8442.0,
+            "returnPct": -8.89,
+        },
+        {
+            "entryDate": "2023-02-01",
+            "exitDate": "2023-02-03",
+            "entryPrice": 110.25,
+            "exitPrice": 118.0,
+            "shares": 788,
+            "pnl": 6107.0,
+            "returnPct": 7.03,
+        },
+    ]
+    assert result["equityCurve"][17] == {"Date": "2023-01-19", "Equity": 101_641.5}
+    assert result["summary"] == {
+        "initialEquity": 100_000.0,
+        "finalEquity": 97_665.0,
+        "totalReturnPct": -2.33,
+        "tradeCount": 2,
+        "winRatePct": 50.0,
+    }
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_run_backtest_matches_reference_loop(fake_ticker, seed):
+    rng = np.random.default_rng(seed)
+    closes = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 120))), 2)
+    opens = np.round(closes * (1 + rng.normal(0, 0.005, 120)), 2)
+    fake_ticker.frame = _ohlc_frame(opens, closes)
+
+    result = run_backtest("TEST", date(2023, 1, 2), date(2023, 5, 1), "1d")
+
+    cross_up, cross_down = _crossover_signals(pd.Series(closes))
+    dates = result["priceHistory"]["Date"]
+    trades, equity_curve = _reference_run_backtest(dates, opens.tolist(), closes.tolist(), cross_up, cross_down)
+    assert trades and result["trades"] == trades
+    assert result["equityCurve"] == equity_curve
+
+
+def test_run_backtest_win_rate_counts_trades_by_reported_pnl(fake_ticker, monkeypatch):
+    def fake_core(opens, closes, cross_up, cross_down, initial_equity):
+        # 0.005 is reported as 0.01 by round() but np.round() gives 0.0.
+        equity = np.full(len(closes), initial_equity)
+        return (
+            equity,
+            np.array([1, 3]),
+            np.array([2, 4]),
+            np.array([100.0, 100.0]),
+            np.array([100.005, 99.0]),
+            np.array([1, 1]),
+            np.array([0.005, -1.0]),
+            2,
+        )
+
+    monkeypatch.setattr(backtest, "_run_backtest_core", fake_core)
+
+    result = run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
+
+    assert [trade["pnl"] for trade in result["trades"]] == [0.01, -1.0]
+    assert result["summary"]["winRatePct"] == 50.0
+
+
+def test_run_backtest_reuses_download_for_closed_ranges(fake_ticker):
+    first = run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
+    second = run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
+
+    assert first == second
+    assert fake_ticker.calls == ["TEST"]
+
+
+def test_run_backtest_refetches_closed_ranges_after_ttl(fake_ticker, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(backtest, "_HISTORY_CACHE", TTLCache(maxsize=32, ttl=60, timer=lambda: now[0]))
+
+    run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
+    now[0] = 61.0
+    run_backtest("TEST", date(2023, 1, 1), date(2023, 1, 20), "1d")
+
+    assert fake_ticker.calls == ["TEST", "TEST"]
+
+
+def test_crossover_signals_flag_only_the_crossing_bar():
+    adj = pd.Series([10.0] * 15 + [9.0, 8.0, 7.0, 20.0, 21.0, 22.0])
+
+    cross_up, cross_down = _crossover_signals(adj)
+
+    assert [i for i, flag in enumerate(cross_up) if flag] == [18]
+    assert [i for i, flag in enumerate(cross_down) if flag] == [15]
+
+
+def _exact_crossovers(prices):
+    # Exact-arithmetic SMAs: a tie between fast and slow never counts as a crossover.
+    values = [Fraction(str(price)) for price in prices]
+
+    def sma(index, length):
+        window = values[max(0, index - length + 1) : index + 1]
+        return sum(window) / len(window)
+
+    up, down = [], []
+    for i in range(1, len(values)):
+        fast, slow = sma(i, 5), sma(i, 15)
+        prev_fast, prev_slow = sma(i - 1, 5), sma(i - 1, 15)
+        if fast > slow and prev_fast <= prev_slow:
+            up.append(i)
+        if fast < slow and prev_fast >= prev_slow:
+            down.append(i)
+    return up, down
+
+
+def test_crossover_signals_treat_equal_means_as_a_tie():
+    # Fast and slow means are exactly equal at bar 18, but rolling-sum noise puts fast
+    # a hair below slow there; the downward cross belongs on bar 19, not 18.
+    adj = pd.Series(
+        [10.7, 10.2, 10.2, 0.3, 10.1, 0.1, 10.7, 10.3, 0.3, 0.1, 10.3]
+        + [10.7, 0.1, 10.7, 10.3, 0.3, 0.3, 10.1, 10.7, 0.3, 10.1]
+    )
+
+    cross_up, cross_down = _crossover_signals(adj)
+
+    assert list(np.flatnonzero(cross_up)) == [14, 17]
+    assert list(np.flatnonzero(cross_down)) == [5, 16, 19]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_crossover_signals_match_exact_means(seed):
+    rng = np.random.default_rng(seed)
+    adj = pd.Series(rng.choice([10.1, 10.2, 10.3, 10.7, 0.1, 0.3], size=60))
+
+    cross_up, cross_down = _crossover_signals(adj)
+
+    assert (list(np.flatnonzero(cross_up)), list(np.flatnonzero(cross_down))) == _exact_crossovers(adj)
+
+
+def test_format_dates_drops_timezone_without_shifting_day():
+    index = pd.DatetimeIndex(["2023-01-02 23:30", "2023-01-03 00:15"]).tz_localize("Europe/Oslo")
+
+    assert _format_dates(index) == ["2023-01-02", "2023-01-03"]
@@ -1,7 +1,11 @@
+import math
+
+import numpy as np
 import pandas as pd
 import pytest
 from pathlib import Path
 
+import engine
 from engine import Signals, apply_cost, atr, backtest_weekly
 
 
@@ -23,18 +27,22 @@ def test_apply_cost_returns_unmodified_price():
     assert apply_cost(88.5, "sell") == pytest.approx(88.5)
 
 
-def test_backtest_weekly_matches_fixture_regression():
+def _fixture_inputs():
     prices = pd.read_csv(FIXTURES / "weekly_prices.csv", parse_dates=["Date"]).set_index("Date")
     signals_df = pd.read_csv(FIXTURES / "strategy_signals.csv", parse_dates=["Date"]).set_index("Date")
-    expected_curve = pd.read_csv(FIXTURES / "expected_equity_curve.csv")
-    expected_trades = pd.read_csv(FIXTURES / "expected_trades.csv")
-
     signals = Signals(
         long_entry=signals_df["long_entry"].astype(bool),
         short_entry=signals_df["short_entry"].astype(bool),
         long_exit=signals_df["long_exit"].astype(bool),
         short_exit=signals_df["short_exit"].astype(bool),
     )
+    return prices, signals
+
+
+def test_backtest_weekly_matches_fixture_regression():
+    prices, signals = _fixture_inputs()
+    expected_curve = pd.read_csv(FIXTURES / "expected_equity_curve.csv")
+    expected_trades = pd.read_csv(FIXTURES / "expected_trades.csv")
 
     result = backtest_weekly(prices, signals, allow_shorts=False, label="Fixture Strategy")
     curve = result["equity_curve"].reset_index()
@@ -58,3 +66,173 @@ def test_backtest_weekly_matches_fixture_regression():
         )
 
     assert trades_payload == expected_trades.to_dict(orient="records")
+
+
+def test_backtest_weekly_reads_cost_model_and_sizing_at_call_time(monkeypatch):
+    prices, signals = _fixture_inputs()
+    monkeypatch.setattr(engine, "apply_cost", lambda price, side: price * 1.01)
+    monkeypatch.setattr(engine, "TARGET_ANNUAL_VOL", 0.05)
+    monkeypatch.setattr(engine, "INITIAL_EQUITY", 50_000.0)
+
+    result = backtest_weekly(prices, signals, allow_shorts=False)
+
+    [trade] = result["trades"]
+    assert trade.entry_price == pytest.approx(103.02)
+    assert trade.exit_price == pytest.approx(108.07)
+    assert trade.shares == pytest.approx(57.78127044)
+
+
+@pytest.mark.parametrize("field", ["signals", "trail_atr_mult", "macro_long", "macro_short"])
+def test_backtest_weekly_rejects_misaligned_inputs(field):
+    prices, signals = _fixture_inputs()
+    short = pd.Series([True, False], index=prices.index[:2])
+    kwargs = {}
+    if field == "signals":
+        signals = Signals(short, signals.short_entry, signals.long_exit, signals.short_exit)
+    else:
+        kwargs[field] = short.astype(float) if field == "trail_atr_mult" else short
+
+    with pytest.raises(ValueError, match="2 rows but the price frame has 5"):
+        backtest_weekly(prices, signals, **kwargs)
+
+
+def _reference_backtest_weekly(w, signals, trail_atr_mult=None, macro_long=None, macro_short=None, allow_shorts=True):
+    """The original row-by-row pandas loop, kept as an oracle for the jitted core.
+
+    Trades are ``(entry_index, entry_price, exit_index, exit_price, shares, pnl, return_pct, side, reason)``.
+    """
+    equity = engine.INITIAL_EQUITY
+    side = None
+    entry_px = np.nan
+    entry_idx = None
+    shares = 0.0
+    atr14 = atr(w["High"], w["Low"], w["Close"], 14)
+    trades = []
+    curve = []
+
+    for i in range(len(w) - 1):
+        idx, next_idx = w.index[i], w.index[i + 1]
+        next_open = w["NextOpen"].iloc[i]
+        if pd.isna(next_open):
+            curve.append(equity)
+            continue
+        allow_long = True if macro_long is None else bool(macro_long.iloc[i])
+        allow_short = True if macro_short is None else bool(macro_short.iloc[i])
+
+        if side is None:
+            if pd.isna(atr14.iloc[i]) or atr14.iloc[i] == 0:
+                curve.append(equity)
+                continue
+            shares_target = (equity * engine.TARGET_ANNUAL_VOL) / (atr14.iloc[i] * math.sqrt(52))
+            if signals.long_entry.iloc[i] and allow_long:
+                entry_px = apply_cost(next_open, "buy")
+                shares = min(shares_target, equity / entry_px)
+                entry_idx = next_idx
+                equity -= shares * entry_px
+                side = "long"
+            elif allow_shorts and signals.short_entry.iloc[i] and allow_short:
+                entry_px = apply_cost(next_open, "sell")
+                shares = min(shares_target, equity / entry_px)
+                equity += shares * entry_px
+                entry_idx = next_idx
+                side = "short"
+        else:
+            adj_close = w["AdjClose"].iloc[i]
+            reason = None
+            if trail_atr_mult is not None and not pd.isna(trail_atr_mult.iloc[i]):
+                if side == "long" and w["Low"].iloc[i] < adj_close - trail_atr_mult.iloc[i]:
+                    reason = "trail"
+                if side == "short" and w["High"].iloc[i] > adj_close + trail_atr_mult.iloc[i]:
+                    reason = "trail"
+            if side == "long" and (signals.long_exit.iloc[i] or not allow_long):
+                reason = reason or ("signal" if signals.long_exit.iloc[i] else "macro")
+            if side == "short" and (signals.short_exit.iloc[i] or not allow_short):
+                reason = reason or ("signal" if signals.short_exit.iloc[i] else "macro")
+            if reason:
+                if side == "long":
+                    px_exit = apply_cost(next_open, "sell")
+                    pnl = shares * px_exit - shares * entry_px
+                    equity += shares * px_exit
+                else:
+                    px_exit = apply_cost(next_open, "buy")
+                    pnl = shares * entry_px - shares * px_exit
+                    equity -= shares * px_exit
+                trades.append((entry_idx, entry_px, next_idx, px_exit, shares, pnl, pnl / (shares * entry_px), side, reason))
+                side = None
+                entry_px = np.nan
+                shares = 0.0
+
+        mtm = equity
+        if side == "long":
+            mtm += shares * w["AdjClose"].iloc[i]
+        elif side == "short":
+            mtm += shares * entry_px - shares * w["AdjClose"].iloc[i]
+        curve.append(mtm)
+
+    if side is not None:
+        final_open = w["NextOpen"].iloc[-2]
+        if not pd.isna(final_open):
+            px_exit = apply_cost(final_open, "sell" if side == "long" else "buy")
+            pnl = shares * (px_exit - entry_px) if side == "long" else shares * (entry_px - px_exit)
+            trades.append((entry_idx, entry_px, w.index[-1], px_exit, shares, pnl, pnl / (shares * entry_px), side, "end"))
+
+    return curve, trades
+
+
+def _random_case(seed):
+    rng = np.random.default_rng(seed)
+    n = 80
+    index = pd.date_range("2020-01-03", periods=n, freq="W-FRI")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))
+    open_ = close * (1 + rng.normal(0, 0.01, n))
+    next_open = pd.Series(open_, index=index).shift(-1)
+    next_open[rng.random(n) < 0.05] = np.nan
+    w = pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n)),
+            "Low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n)),
+            "Close": close,
+            "AdjClose": close,
+            "NextOpen": next_open,
+        },
+        index=index,
+    )
+
+    def flags(p):
+        return pd.Series(rng.random(n) < p, index=index)
+
+    signals = Signals(flags(0.15), flags(0.15), flags(0.1), flags(0.1))
+    trail = atr(w["High"], w["Low"], w["Close"], 14) * rng.uniform(0.5, 2.0)
+    trail[rng.random(n) < 0.2] = np.nan
+    return w, signals, trail, flags(0.85), flags(0.85)
+
+
+@pytest.mark.parametrize("seed", range(25))
+@pytest.mark.parametrize("filters", [False, True])
+def test_backtest_weekly_matches_reference_loop(seed, filters):
+    w, signals, trail, macro_long, macro_short = _random_case(seed)
+    kwargs = {"trail_atr_mult": trail, "macro_long": macro_long, "macro_short": macro_short} if filters else {}
+
+    result = backtest_weekly(w, signals, **kwargs)
+    expected_curve, expected_trades = _reference_backtest_weekly(w, signals, **kwargs)
+
+    assert result["equity_curve"]["Equity"].tolist() == pytest.approx(expected_curve)
+    assert [(t.entry_index, t.exit_index) for t in result["trades"]] == [(e[0], e[2]) for e in expected_trades]
+    actual_values = [[t.entry_price, t.exit_price, t.shares, t.pnl, t.return_pct] for t in result["trades"]]
+    for actual, expected in zip(actual_values, expected_trades):
+        assert actual == pytest.approx([expected[1], *expected[3:7]])
+
+
+def test_reference_cases_cover_shorts_gaps_and_open_positions():
+    cases = [_random_case(seed) for seed in range(25)]
+    trades = [
+        trade
+        for w, signals, trail, macro_long, macro_short in cases
+        for trade in _reference_backtest_weekly(w, signals, trail, macro_long, macro_short)[1]
+    ]
+
+    assert {trade[7] for trade in trades} == {"long", "short"}
+    assert {trade[8] for trade in trades} == {"signal", "trail", "macro", "end"}
+    assert any(w["NextOpen"].iloc[:-1].isna().any() for w, *_ in cases)
+    assert any(trail.isna().any() for _, _, trail, *_ in cases)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import market_data
+from app.market_data import MarketDataRequest, _normalise_data_points, _serialise_dataframe, fetch_market_data
+
+
+@pytest.fixture(autouse=True)
+def _clear_market_data_cache():
+    market_data._MARKET_DATA_CACHE.clear()
+    yield
+    market_data._MARKET_DATA_CACHE.clear()
+
+
+def test_serialise_dataframe_orders_columns_and_skips_missing_values():
+    frame = pd.DataFrame(
+        {
+            "Open": [10.0, np.nan, 12.0],
+            "Close": [10.5, 11.5, np.nan],
+            "Volume": [100, 200, 300],
+        },
+        index=pd.date_range("2023-01-02", periods=3, freq="D"),
+    )
+
+    payload = _serialise_dataframe(frame, ["Volume", "Open", "High"])
+
+    assert payload == [
+        {"timestamp": "2023-01-02T00:00:00", "Volume": 100.0, "Open": 10.0},
+        {"timestamp": "2023-01-03T00:00:00", "Volume": 200.0},
+        {"timestamp": "2023-01-04T00:00:00", "Volume": 300.0, "Open": 12.0},
+    ]
+
+
+def test_serialise_dataframe_drops_empty_rows():
+    frame = pd.DataFrame(
+        {"Close": [1.0, np.nan]},
+        index=pd.date_range("2023-01-02", periods=2, freq="D"),
+    )
+
+    assert _serialise_dataframe(frame, ["Close"]) == [{"timestamp": "2023-01-02T00:00:00", "Close": 1.0}]
+
+
+def test_serialise_dataframe_formats_timestamps_as_naive_local_time():
+    frame = pd.DataFrame(
+        {"Close": [1.0, 2.0]},
+        index=pd.DatetimeIndex(["2023-01-03 09:30", "2023-01-03 09:35"]).tz_localize("America/New_York"),
+    )
+
+    assert [entry["timestamp"] for entry in _serialise_dataframe(frame, ["Close"])] == [
+        "2023-01-03T09:30:00",
+        "2023-01-03T09:35:00",
+    ]
+
+
+def test_normalise_data_points_maps_aliases_and_deduplicates():
+    assert _normalise_data_points([" close", "Adj_Close", "CLOSE", "", "adjclose"]) == ["Close", "Adj Close"]
+
+
+def test_normalise_data_points_returns_canonical_ohlcv_order():
+    assert _normalise_data_points(["volume", "Open", "adj close", "high"]) == ["Open", "High", "Adj Close", "Volume"]
+
+
+def test_normalise_data_points_rejects_unknown_points():
+    with pytest.raises(ValueError, match="Unsupported data point 'bid'"):
+        _normalise_data_points(["bid"])
+
+    with pytest.raises(ValueError, match="At least one data point"):
+        _normalise_data_points([" "])
+
+
+def test_fetch_market_data_reuses_cached_result(monkeypatch):
+    calls = []
+
+    def fake_download(**kwargs):
+        calls.append(kwargs)
+        return pd.DataFrame({"Close": [1.0, 2.0]}, index=pd.date_range("2023-01-02", periods=2, freq="D"))
+
+    monkeypatch.setattr(market_data.yf, "download", fake_download)
+
+    first = fetch_market_data(MarketDataRequest(["spy"], "5d", "1d", ["close"]))
+    second = fetch_market_data(MarketDataRequest([" SPY "], "5d", "1d", ["Close", "CLOSE"]))
+    fetch_market_data(MarketDataRequest(["SPY"], "1mo", "1d", ["close"]))
+
+    assert second is first
+    assert first["SPY"][1] == {"timestamp": "2023-01-03T00:00:00", "Close": 2.0}
+    assert len(calls) == 2